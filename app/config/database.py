@@ -1,6 +1,9 @@
+import asyncio
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.config.settings import settings
+import orjson
 
 # Automatically convert DATABASE_URL to use asyncpg if needed
 database_url = settings.DATABASE_URL
@@ -11,12 +14,23 @@ elif not database_url.startswith("postgresql+asyncpg://"):
     # If it's already using a different async driver, keep it
     pass
 
+def _json_serializer(obj) -> str:
+    """Serialize JSON/JSONB column values with orjson."""
+    return orjson.dumps(obj).decode()
+
+
 # Create async engine
 engine = create_async_engine(
     database_url,
     echo=settings.DEBUG,
     future=True,
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
     pool_pre_ping=True,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
 )
 
 # Create async session factory
@@ -26,8 +40,27 @@ async_session = async_sessionmaker(
     expire_on_commit=False,
 )
 
+async def warm_up_pool():
+    """
+    Open DB_POOL_SIZE connections up front so the first requests after
+    startup don't pay the connection handshake.
+    """
+    if not isinstance(engine.pool, AsyncAdaptedQueuePool):
+        # NullPool/StaticPool don't keep idle connections around
+        return
+    
+    connections = await asyncio.gather(
+        *(engine.connect().start() for _ in range(settings.DB_POOL_SIZE))
+    )
+    for conn in connections:
+        await conn.close()
+
+
 # Base for all models
-Base = declarative_base()
+class Base(DeclarativeBase):
+    # Fetch server-generated timestamps with RETURNING on INSERT and UPDATE
+    # so they are never lazy-loaded afterwards
+    __mapper_args__ = {"eager_defaults": True}
 
 
 async def get_db():
@@ -1,36 +1,46 @@
-from fastapi import FastAPI, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 from app.config.settings import settings
-from app.config.database import engine, Base
+from app.config.database import engine, Base, warm_up_pool
 from app.routes import auth, keys, wallet, paystack
+from app.services.paystack import paystack_client_lifespan, webhook_log_writer_lifespan
 from app.utils.exceptions import WalletException
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
+from app.utils.limiter import limiter
+from app.schemas import (
+    BalanceResponse,
+    DepositResponse,
+    DepositStatusResponse,
+    TransferResponse,
+    TransactionHistoryResponse,
+    APIKeyListResponse,
+)
 import logging
+import msgspec
 
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize rate limiter
-limiter = Limiter(key_func=get_remote_address)
-
-
 @asynccontextmanager
-async def lifespan(app: FastAPI):
+async def database_lifespan(app: FastAPI):
     """
-    Application lifespan management.
-    - Startup: Create database tables
+    Database lifespan.
+    - Startup: Create database tables (outside production) and warm up the connection pool
     - Shutdown: Close database connection
     """
     # Startup
-    logger.info("Creating database tables...")
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # Schema introspection + DDL on every worker start is wasted work in
+    # production, where `alembic upgrade head` runs once at deploy time
+    if settings.ENVIRONMENT != "production":
+        logger.info("Creating database tables...")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    
+    logger.info("Warming up database connection pool...")
+    await warm_up_pool()
     
     yield
     
@@ -39,11 +49,26 @@ async def lifespan(app: FastAPI):
     await engine.dispose()
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application lifespan management.
+    Composes the database, Paystack client and webhook-log writer
+    lifespans; shutdown runs in reverse order, so queued webhook logs are
+    flushed before the engine is disposed.
+    """
+    async with database_lifespan(app), paystack_client_lifespan(app), webhook_log_writer_lifespan(app):
+        yield
+
+
 app = FastAPI(
     title="Wallet Service",
     description="Wallet service with Paystack, JWT & API Keys",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+    # Per-IP rate limits (RATE_LIMIT_DEFAULT unless a route sets its own)
+    dependencies=[Depends(limiter.check)],
     swagger_ui_parameters={
         "persistAuthorization": True,
     },
@@ -62,6 +87,20 @@ def custom_openapi():
         routes=app.routes,
     )
     
+    # Response bodies declared as msgspec Structs (see msgspec_responses)
+    _, struct_schemas = msgspec.json.schema_components(
+        [
+            BalanceResponse,
+            DepositResponse,
+            DepositStatusResponse,
+            TransferResponse,
+            TransactionHistoryResponse,
+            APIKeyListResponse,
+        ],
+        ref_template="#/components/schemas/{name}",
+    )
+    openapi_schema.setdefault("components", {}).setdefault("schemas", {}).update(struct_schemas)
+    
     # Add security schemes
     openapi_schema["components"]["securitySchemes"] = {
         "HTTPBearer": {
@@ -77,23 +116,22 @@ def custom_openapi():
             "description": "Enter your API key"
         }
     }
+    # Routes authenticate via the require_auth dependency rather than
+    # FastAPI security classes, so declare the schemes globally for Swagger
+    openapi_schema["security"] = [{"HTTPBearer": []}, {"APIKeyHeader": []}]
     
     app.openapi_schema = openapi_schema
     return app.openapi_schema
 
 app.openapi = custom_openapi
 
-# Add rate limiter to app state
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-
-
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=[settings.FRONTEND_ORIGIN],
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "DELETE"],
+    allow_headers=["Authorization", "x-api-key", "content-type"],
+    max_age=86400,  # Let browsers cache preflight responses for a day
 )
 
 
@@ -101,7 +139,7 @@ app.add_middleware(
 @app.exception_handler(WalletException)
 async def wallet_exception_handler(request, exc: WalletException):
     """Handle wallet-specific exceptions."""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail},
     )
@@ -110,7 +148,7 @@ async def wallet_exception_handler(request, exc: WalletException):
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request, exc: RequestValidationError):
     """Handle validation errors."""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
         content={"detail": exc.errors()},
     )
@@ -120,7 +158,7 @@ async def validation_exception_handler(request, exc: RequestValidationError):
 async def general_exception_handler(request, exc: Exception):
     """Handle unexpected errors."""
     logger.error(f"Unexpected error: {exc}", exc_info=True)
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={"detail": "Internal server error"},
     )
@@ -135,6 +173,7 @@ app.include_router(paystack.router)
 
 
 @app.get("/health", tags=["health"])
+@limiter.exempt
 async def health_check():
     """Health check endpoint."""
     return {
@@ -1,8 +1,30 @@
-from fastapi import Request
-from typing import Optional, Tuple
-from app.config.database import async_session
-from app.services.auth import get_auth_user
-from app.models import User
+from fastapi import Depends, Request
+from typing import Dict, Optional, Tuple
+from uuid import UUID
+from cachetools import TTLCache
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.database import get_db
+from app.config.settings import settings
+from app.services.auth import get_auth_user, check_api_key
+from app.utils.security import verify_jwt
+from app.models import User, APIKey
+import asyncio
+import hashlib
+
+
+# Successful authentications keyed by (auth_type, blake2b digest of the credential).
+# Values are (User, user_id, APIKey record or None). Per-process only; the TTL
+# bounds how long a revocation in another worker can go unnoticed.
+_auth_cache: TTLCache = TTLCache(maxsize=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL)
+
+# One lock per credential currently being looked up, so concurrent cache
+# misses for the same credential run the DB query and key check once
+_auth_locks: Dict[tuple, asyncio.Lock] = {}
+
+
+def _cache_key(credential: str) -> bytes:
+    """Short binary digest of a credential for use as a cache key."""
+    return hashlib.blake2b(credential.encode(), digest_size=16).digest()
 
 
 class AuthContext:
@@ -39,6 +61,7 @@ async def extract_auth_header(request: Request) -> Tuple[Optional[str], Optional
 
 async def get_authenticated_user(
     request: Request,
+    session: AsyncSession,
     required_permission: Optional[str] = None,
 ) -> AuthContext:
     """
@@ -46,6 +69,7 @@ async def get_authenticated_user(
     
     Args:
         request: FastAPI Request
+        session: The request's AsyncSession (from get_db)
         required_permission: Optional permission required for API key
     
     Returns:
@@ -55,21 +79,103 @@ async def get_authenticated_user(
         Various authentication exceptions
     """
     jwt_token, api_key = await extract_auth_header(request)
+    auth_type = "jwt" if jwt_token else "api_key"
+    credential = jwt_token or api_key
+    
+    cache_key = (auth_type, _cache_key(credential or ""))
+    cached = _auth_cache.get(cache_key)
+    
+    if cached:
+        user, user_id, stored_key = cached
+        _recheck_cached(stored_key, jwt_token, required_permission)
+    else:
+        lock = _auth_locks.setdefault(cache_key, asyncio.Lock())
+        try:
+            async with lock:
+                user, user_id, stored_key = await _authenticate(
+                    cache_key, jwt_token, api_key, session, required_permission
+                )
+        finally:
+            if _auth_locks.get(cache_key) is lock:
+                del _auth_locks[cache_key]
     
-    async with async_session() as session:
-        user, user_id = await get_auth_user(
-            token=jwt_token,
-            api_key=api_key,
-            session=session,
-            required_permission=required_permission,
-        )
-        
-        auth_type = "jwt" if jwt_token else "api_key"
-        
-        return AuthContext(
-            user=user,
-            user_id=user_id,
-            auth_type=auth_type,
-            token=jwt_token,
-            api_key=api_key,
-        )
+    return AuthContext(
+        user=user,
+        user_id=user_id,
+        auth_type=auth_type,
+        token=jwt_token,
+        api_key=api_key,
+    )
+
+
+def require_auth(required_permission: Optional[str] = None):
+    """
+    Dependency factory for authenticated routes.
+    
+    Usage: auth_context: AuthContext = Depends(require_auth("read"))
+    
+    The permission only applies to API keys; JWT users have full access.
+    The dependency shares the route's get_db session (FastAPI caches it per
+    request), so authentication doesn't open a second one.
+    """
+    async def dependency(request: Request, session: AsyncSession = Depends(get_db)) -> AuthContext:
+        return await get_authenticated_user(request, session, required_permission)
+    
+    return dependency
+
+
+def _recheck_cached(
+    stored_key: Optional[APIKey],
+    jwt_token: Optional[str],
+    required_permission: Optional[str],
+) -> None:
+    """Re-check expiry (and permissions for API keys) on a cached authentication."""
+    if stored_key is None:
+        verify_jwt(jwt_token)
+    else:
+        check_api_key(stored_key, required_permission)
+
+
+async def _authenticate(
+    cache_key: tuple,
+    jwt_token: Optional[str],
+    api_key: Optional[str],
+    session: AsyncSession,
+    required_permission: Optional[str],
+) -> Tuple[User, str, Optional[APIKey]]:
+    """Authenticate on a cache miss (holding the credential's lock) and cache the result."""
+    cached = _auth_cache.get(cache_key)
+    if cached:
+        # Filled by the request we waited on
+        _recheck_cached(cached[2], jwt_token, required_permission)
+        return cached
+    
+    user, user_id, stored_key = await get_auth_user(
+        token=jwt_token,
+        api_key=api_key,
+        session=session,
+        required_permission=required_permission,
+    )
+    # Detach before caching so a later rollback in this request's
+    # session can't expire objects that other requests will reuse
+    session.expunge(user)
+    if stored_key is not None:
+        session.expunge(stored_key)
+    _auth_cache[cache_key] = (user, user_id, stored_key)
+    return user, user_id, stored_key
+
+
+def invalidate_api_key(key_id: UUID) -> None:
+    """Drop cached authentications for an API key (e.g. after revocation)."""
+    for cache_key, (_, _, stored_key) in list(_auth_cache.items()):
+        if stored_key is not None and str(stored_key.id) == str(key_id):
+            _auth_cache.pop(cache_key, None)
+
+
+def prime_api_key_cache(api_key: str, stored_key: APIKey, user: User, session: AsyncSession) -> None:
+    """
+    Cache a freshly issued (and committed) API key, so the first request
+    made with it skips the database lookup and hash check.
+    """
+    session.expunge(stored_key)
+    _auth_cache[("api_key", _cache_key(api_key))] = (user, str(user.id), stored_key)
@@ -1,27 +1,30 @@
-from sqlalchemy import Column, String, DateTime, Boolean, ForeignKey, Index, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import String, CHAR, DateTime, func, Boolean, ForeignKey, Index, JSON
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID
 from app.config.database import Base
 from datetime import datetime
+from typing import List, Optional
 import uuid
 
 
 class APIKey(Base):
     __tablename__ = "api_keys"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
-    key_hash = Column(String(255), unique=True, index=True, nullable=False)  # bcrypt hash
-    name = Column(String(255), nullable=False)
-    permissions = Column(JSON, default=[], nullable=False)  # ["deposit", "transfer", "read"]
-    is_active = Column(Boolean, default=True, index=True)
-    is_revoked = Column(Boolean, default=False, index=True)
-    expires_at = Column(DateTime, nullable=False, index=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    key_hash: Mapped[str] = mapped_column(String(255), unique=True, index=True, nullable=False)  # HMAC-SHA256 (older keys: bcrypt)
+    # HMAC-SHA256 of the key; NULL for keys issued before it existed, filled in on their next use
+    key_lookup: Mapped[Optional[str]] = mapped_column(CHAR(64), unique=True, index=True, nullable=True)
+    name: Mapped[str] = mapped_column(String(255), nullable=False)
+    permissions: Mapped[List[str]] = mapped_column(JSON, default=[], nullable=False)  # ["deposit", "transfer", "read"]
+    is_active: Mapped[Optional[bool]] = mapped_column(Boolean, default=True, index=True)
+    is_revoked: Mapped[Optional[bool]] = mapped_column(Boolean, default=False, index=True)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Relationships
-    user = relationship("User", back_populates="api_keys")
+    user: Mapped["User"] = relationship("User", back_populates="api_keys")
     
     __table_args__ = (
         Index("ix_api_key_user_active", "user_id", "is_active"),
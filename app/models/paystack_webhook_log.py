@@ -1,21 +1,32 @@
-from sqlalchemy import Column, String, DateTime, Boolean, ForeignKey, Index, JSON
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import String, DateTime, func, Boolean, ForeignKey, Index, JSON
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from app.config.database import Base
 from datetime import datetime
+from typing import Optional
 import uuid
+from uuid_utils.compat import uuid7
 
 
 class PaystackWebhookLog(Base):
     __tablename__ = "paystack_webhook_logs"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    event = Column(String(50), nullable=False, index=True)
-    reference = Column(String(255), index=True, nullable=True)
-    transaction_id = Column(UUID(as_uuid=True), ForeignKey("transactions.id"), nullable=True, index=True)
-    payload = Column(JSON, nullable=False)
-    processed = Column(Boolean, default=False, index=True)
-    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid7)  # time-ordered for btree locality
+    event: Mapped[str] = mapped_column(String(50), nullable=False, index=True)
+    reference: Mapped[Optional[str]] = mapped_column(String(255), index=True, nullable=True)
+    transaction_id: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True), ForeignKey("transactions.id"), nullable=True, index=True)
+    payload: Mapped[dict] = mapped_column(JSON().with_variant(JSONB(), "postgresql"), nullable=False)
+    processed: Mapped[Optional[bool]] = mapped_column(Boolean, default=False, index=True)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), index=True)
     
     __table_args__ = (
-        Index("ix_webhook_reference_processed", "reference", "processed"),
+        # One log per (reference, event); also covers the idempotency lookup
+        # so it can be answered from the index alone
+        Index(
+            "ix_webhook_reference_event",
+            "reference",
+            "event",
+            unique=True,
+            postgresql_include=["id", "processed"],
+        ),
     )
@@ -1,9 +1,11 @@
-from sqlalchemy import Column, String, DateTime, Float, ForeignKey, Index, Enum as SQLEnum, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import String, DateTime, func, BigInteger, ForeignKey, Index, Enum as SQLEnum, JSON
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID
 from app.config.database import Base
 from datetime import datetime
+from typing import Optional
 import uuid
+from uuid_utils.compat import uuid7
 import enum
 
 
@@ -22,23 +24,25 @@ class TransactionStatus(str, enum.Enum):
 class Transaction(Base):
     __tablename__ = "transactions"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
-    wallet_id = Column(UUID(as_uuid=True), ForeignKey("wallets.id"), nullable=False, index=True)
-    type = Column(SQLEnum(TransactionType), nullable=False, index=True)
-    amount = Column(Float, nullable=False)
-    status = Column(SQLEnum(TransactionStatus), default=TransactionStatus.PENDING, index=True)
-    reference = Column(String(255), unique=True, index=True, nullable=True)  # Paystack reference
-    recipient_wallet_id = Column(UUID(as_uuid=True), ForeignKey("wallets.id"), nullable=True)  # For transfers
-    description = Column(String(500), nullable=True)
-    meta = Column(JSON, default={}, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow, index=True)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid7)  # time-ordered for btree locality
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)  # indexed by ix_transaction_user_created
+    wallet_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("wallets.id"), nullable=False, index=True)
+    type: Mapped[TransactionType] = mapped_column(SQLEnum(TransactionType, native_enum=False, length=16, create_constraint=True, name="transaction_type"), nullable=False, index=True)
+    amount: Mapped[int] = mapped_column(BigInteger, nullable=False)  # In kobo
+    status: Mapped[Optional[TransactionStatus]] = mapped_column(SQLEnum(TransactionStatus, native_enum=False, length=16, create_constraint=True, name="transaction_status"), default=TransactionStatus.PENDING, index=True)
+    reference: Mapped[Optional[str]] = mapped_column(String(255), unique=True, index=True, nullable=True)  # Paystack reference
+    recipient_wallet_id: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True), ForeignKey("wallets.id"), nullable=True)  # For transfers
+    description: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
+    meta: Mapped[Optional[dict]] = mapped_column(JSON, default={}, nullable=True)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), index=True)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Relationships
-    user = relationship("User", back_populates="transactions", foreign_keys=[user_id])
-    wallet = relationship("Wallet", back_populates="transactions", foreign_keys=[wallet_id])
+    user: Mapped["User"] = relationship("User", back_populates="transactions", foreign_keys=[user_id])
+    wallet: Mapped["Wallet"] = relationship("Wallet", back_populates="transactions", foreign_keys=[wallet_id])
     
     __table_args__ = (
         Index("ix_transaction_status_created", "status", "created_at"),
+        # Serves a user's history page (WHERE user_id ORDER BY created_at DESC) without a sort
+        Index("ix_transaction_user_created", "user_id", created_at.desc()),
     )
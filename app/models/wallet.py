@@ -1,22 +1,23 @@
-from sqlalchemy import Column, String, DateTime, Float, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import String, DateTime, func, BigInteger, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID
 from app.config.database import Base
 from datetime import datetime
+from typing import List, Optional
 import uuid
 
 
 class Wallet(Base):
     __tablename__ = "wallets"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, unique=True, index=True)
-    wallet_number = Column(String(20), unique=True, index=True, nullable=False)
-    balance = Column(Float, default=0.0)
-    currency = Column(String(3), default="NGN")
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, unique=True, index=True)
+    wallet_number: Mapped[str] = mapped_column(String(20), unique=True, index=True, nullable=False)
+    balance: Mapped[Optional[int]] = mapped_column(BigInteger, default=0)  # In kobo
+    currency: Mapped[Optional[str]] = mapped_column(String(3), default="NGN")
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Relationships
-    user = relationship("User", back_populates="wallets")
-    transactions = relationship("Transaction", back_populates="wallet", foreign_keys="Transaction.wallet_id", cascade="all, delete-orphan")
+    user: Mapped["User"] = relationship("User", back_populates="wallets")
+    transactions: Mapped[List["Transaction"]] = relationship("Transaction", back_populates="wallet", foreign_keys="Transaction.wallet_id", cascade="all, delete-orphan")
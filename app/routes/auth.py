@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.config.database import get_db
@@ -6,6 +6,7 @@ from app.config.settings import settings
 from app.models import User
 from app.schemas import AuthToken
 from app.utils.security import create_jwt
+from app.utils.limiter import limiter
 from google.oauth2 import id_token
 from google.auth.transport import requests as google_requests
 from google_auth_oauthlib.flow import Flow
@@ -79,7 +80,9 @@ async def google_login():
 
 
 @router.get("/google/callback")
+@limiter.limit("10/minute")
 async def google_callback(
+    request: Request,
     code: str,
     state: str = None,
     session: AsyncSession = Depends(get_db),
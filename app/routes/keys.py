@@ -1,11 +1,7 @@
-from fastapi import APIRouter, Depends, Request, HTTPException, status
-from fastapi.security import HTTPBearer
+from fastapi import APIRouter, Depends, Request, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.config.database import get_db
-from app.middleware.auth import get_authenticated_user
-
-# Security scheme (optional - auto_error=False for better error handling)
-security = HTTPBearer(auto_error=False)
+from app.middleware.auth import AuthContext, require_auth, invalidate_api_key, prime_api_key_cache
 from app.services.wallet import (
     create_api_key,
     rollover_api_key,
@@ -17,8 +13,12 @@ from app.schemas import (
     CreateAPIKeyResponse,
     RolloverAPIKeyRequest,
     RolloverAPIKeyResponse,
+    APIKeyListItem,
     APIKeyListResponse,
 )
+from app.utils.responses import MsgspecResponse, msgspec_responses
+from uuid import UUID
+import msgspec
 
 router = APIRouter(prefix="/keys", tags=["api-keys"])
 
@@ -28,13 +28,11 @@ async def create_key(
     request: Request,
     payload: CreateAPIKeyRequest,
     session: AsyncSession = Depends(get_db),
-    token: str = Depends(security),
+    auth_context: AuthContext = Depends(require_auth()),
 ):
     """
     Create a new API key.
     """
-    auth_context = await get_authenticated_user(request)
-    
     api_key_string, api_key_obj = await create_api_key(
         user_id=auth_context.user.id,
         name=payload.name,
@@ -44,6 +42,7 @@ async def create_key(
     )
     
     await session.commit()
+    prime_api_key_cache(api_key_string, api_key_obj, auth_context.user, session)
     
     return CreateAPIKeyResponse(
         api_key=api_key_string,
@@ -57,13 +56,11 @@ async def rollover_key(
     request: Request,
     payload: RolloverAPIKeyRequest,
     session: AsyncSession = Depends(get_db),
-    token: str = Depends(security),
+    auth_context: AuthContext = Depends(require_auth()),
 ):
     """
     Rollover an expired API key.
     """
-    auth_context = await get_authenticated_user(request)
-    
     api_key_string, api_key_obj = await rollover_api_key(
         user_id=auth_context.user.id,
         expired_key_id=payload.expired_key_id,
@@ -72,6 +69,8 @@ async def rollover_key(
     )
     
     await session.commit()
+    invalidate_api_key(payload.expired_key_id)
+    prime_api_key_cache(api_key_string, api_key_obj, auth_context.user, session)
     
     return RolloverAPIKeyResponse(
         api_key=api_key_string,
@@ -79,40 +78,40 @@ async def rollover_key(
     )
 
 
-@router.get("/list", response_model=APIKeyListResponse)
+@router.get("/list", response_class=MsgspecResponse, responses=msgspec_responses(APIKeyListResponse))
 async def list_keys(
     request: Request,
+    limit: int = Query(50, ge=1, le=100),
+    offset: int = Query(0, ge=0),
     session: AsyncSession = Depends(get_db),
-    token: str = Depends(security),
+    auth_context: AuthContext = Depends(require_auth()),
 ):
     """
-    List all API keys for the user.
+    List the user's API keys, newest first.
     """
-    auth_context = await get_authenticated_user(request)
-    
-    keys = await list_api_keys(
+    keys, total_count = await list_api_keys(
         user_id=auth_context.user.id,
         session=session,
+        limit=limit,
+        offset=offset,
     )
     
-    return APIKeyListResponse(
-        keys=keys,
-        count=len(keys),
-    )
+    return MsgspecResponse(APIKeyListResponse(
+        keys=msgspec.convert(keys, list[APIKeyListItem], from_attributes=True),
+        count=total_count,
+    ))
 
 
 @router.post("/revoke/{key_id}")
 async def revoke_key(
     request: Request,
-    key_id: str,
+    key_id: UUID,
     session: AsyncSession = Depends(get_db),
-    token: str = Depends(security),
+    auth_context: AuthContext = Depends(require_auth()),
 ):
     """
     Revoke an API key.
     """
-    auth_context = await get_authenticated_user(request)
-    
     await revoke_api_key(
         user_id=auth_context.user.id,
         key_id=key_id,
@@ -120,5 +119,6 @@ async def revoke_key(
     )
     
     await session.commit()
+    invalidate_api_key(key_id)
     
     return {"status": "success", "message": "API key revoked"}
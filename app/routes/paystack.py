@@ -1,22 +1,29 @@
 from fastapi import APIRouter, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.config.database import async_session
-from app.utils.paystack import verify_paystack_webhook
+from app.utils.paystack import new_webhook_hmac, check_webhook_signature
 from app.utils.logger import logger
+from app.utils.limiter import limiter
 from app.services.paystack import (
     get_transaction_by_reference,
     credit_wallet,
     get_or_create_webhook_log,
     mark_webhook_processed,
     update_transaction_status,
+    enqueue_webhook_log,
 )
+from app.services.wallet import invalidate_balance
 from app.models import TransactionStatus
-import json
+import orjson
 
 router = APIRouter(prefix="/wallet", tags=["paystack"])
 
+# Events that change a transaction; everything else is acknowledged and dropped
+HANDLED_EVENTS = frozenset({"charge.success", "charge.failed", "charge.pending"})
+
 
 @router.post("/paystack/webhook", status_code=status.HTTP_200_OK)
+@limiter.limit("600/minute")  # Headroom for Paystack retry bursts
 async def paystack_webhook(request: Request):
     """
     Handle Paystack webhook events.
@@ -28,22 +35,28 @@ async def paystack_webhook(request: Request):
     - Handle idempotently (no double-credit)
     
     """
-    body = await request.body()
     signature = request.headers.get("x-paystack-signature")
     
     if not signature:
         logger.warning("Missing Paystack signature header")
         return {"status": False, "message": "Missing signature"}
+    
+    # Sign the body as it streams in rather than buffering it first
+    hash_object = new_webhook_hmac()
+    body = bytearray()
+    async for chunk in request.stream():
+        hash_object.update(chunk)
+        body += chunk
         
     try:
-        verify_paystack_webhook(body, signature)
+        check_webhook_signature(hash_object.digest(), signature)
     except Exception as e:
         logger.warning(f"Signature verification failed: {e}")
         return {"status": False, "message": "Invalid signature"}
     
     try:
-        payload = json.loads(body)
-    except json.JSONDecodeError:
+        payload = orjson.loads(body)
+    except orjson.JSONDecodeError:
         logger.warning("Invalid JSON in webhook body")
         return {"status": False, "message": "Invalid JSON"}
     
@@ -53,10 +66,16 @@ async def paystack_webhook(request: Request):
     status_from_paystack = data.get("status")
     amount = data.get("amount", 0)  # In kobo
     
+    logger.info(f"Received Paystack webhook: event={event} reference={reference}")
+    
+    # Acknowledge events we don't act on without waiting on the database;
+    # their audit rows are written in batches in the background
+    if event not in HANDLED_EVENTS:
+        enqueue_webhook_log(request.app, event, reference, data)
+        return {"status": True}
+    
+    credited_user_id = None
     async with async_session() as session:
-        # Log all incoming events
-        logger.info(f"Received Paystack webhook: event={event} reference={reference}")
-
         webhook_log = await get_or_create_webhook_log(
             event=event,
             reference=reference,
@@ -65,7 +84,7 @@ async def paystack_webhook(request: Request):
         )
         
         if webhook_log.processed:
-            await session.commit()
+            # Duplicate delivery; nothing was written, so nothing to commit
             return {"status": True}
         
         if event == "charge.success" and status_from_paystack == "success":
@@ -76,13 +95,12 @@ async def paystack_webhook(request: Request):
                     logger.error(f"Transaction not found for reference: {reference}")
                     return {"status": True}
                 
-                expected_kobo = int(transaction.amount * 100)
-                if amount != expected_kobo:
+                if amount != transaction.amount:
                     logger.warning(
                         "Amount mismatch in webhook",
                         extra={
                             "paystack_amount": amount,
-                            "expected_kobo": expected_kobo,
+                            "expected_kobo": transaction.amount,
                             "reference": reference
                         }
                     )
@@ -101,6 +119,7 @@ async def paystack_webhook(request: Request):
                         "amount": transaction.amount,
                     }
                 )
+                credited_user_id = transaction.user_id
                 
             except Exception as e:
                 logger.error(f"Webhook processing failed (success): {e}", exc_info=True)
@@ -144,9 +163,13 @@ async def paystack_webhook(request: Request):
                 await session.rollback()
 
         else:
-            # Mark as processed even if not an event we care about deeply, so we don't ignore it forever if sent
+            # charge.success whose data status isn't "success": nothing to credit
             webhook_log.processed = True
         
         await session.commit()
     
+    # Only drop the cached balance once the credit is visible
+    if credited_user_id is not None:
+        invalidate_balance(credited_user_id)
+    
     return {"status": True}
@@ -1,19 +1,15 @@
 from fastapi import APIRouter, Depends, Request, Query
-from fastapi.security import HTTPBearer, APIKeyHeader
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.config.database import get_db
-from app.middleware.auth import get_authenticated_user
-
-# Security schemes (optional - auto_error=False allows API key auth)
-security = HTTPBearer(auto_error=False)
-api_key_header = APIKeyHeader(name="x-api-key", auto_error=False)
+from app.middleware.auth import AuthContext, require_auth
 from app.services.wallet import (
     get_or_create_wallet,
-    get_wallet_balance,
+    get_cached_balance,
     get_transaction_history,
     transfer_funds,
     create_transaction,
+    invalidate_balance,
 )
 from app.services.paystack import (
     PaystackService,
@@ -28,41 +24,35 @@ from app.schemas import (
     BalanceResponse,
     TransferRequest,
     TransferResponse,
+    TransactionResponse,
     TransactionHistoryResponse,
 )
+from app.utils.responses import MsgspecResponse, msgspec_responses
 from datetime import datetime
-import uuid
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+from uuid_utils.compat import uuid7
+import msgspec
+from app.utils.limiter import limiter
 
 router = APIRouter(prefix="/wallet", tags=["wallet"])
-limiter = Limiter(key_func=get_remote_address)
 
 
-@router.post("/deposit", response_model=DepositResponse)
+@router.post("/deposit", response_class=MsgspecResponse, responses=msgspec_responses(DepositResponse))
 @limiter.limit("10/minute")  # Max 10 deposits per minute per IP
 async def deposit(
     request: Request,
     payload: DepositRequest,
     session: AsyncSession = Depends(get_db),
-    token: str = Depends(security),
-    api_key: str = Depends(api_key_header),
+    auth_context: AuthContext = Depends(require_auth("deposit")),
 ):
     """
     Initiate a wallet deposit using Paystack.
     """
-    # Check permission if API key
-    if request.headers.get("x-api-key"):
-        auth_context = await get_authenticated_user(request, required_permission="deposit")
-    else:
-        auth_context = await get_authenticated_user(request)
-    
     # Get or create wallet
     wallet = await get_or_create_wallet(auth_context.user, session)
-    await session.refresh(wallet)
     
     # Create transaction record (pending)
-    reference = f"paystack_{uuid.uuid4().hex[:12]}"
+    # uuid7 is time-ordered, so new references land at the right edge of the index
+    reference = f"paystack_{uuid7().hex}"
     transaction = await create_transaction(
         user_id=auth_context.user.id,
         wallet_id=wallet.id,
@@ -75,7 +65,7 @@ async def deposit(
     await session.commit()
     
     # Initialize Paystack transaction
-    paystack = PaystackService()
+    paystack = PaystackService(request.app.state.paystack_client)
     paystack_response = await paystack.initialize_transaction(
         email=auth_context.user.email,
         amount=payload.amount,
@@ -83,20 +73,19 @@ async def deposit(
         meta={"wallet_id": str(wallet.id), "user_id": str(auth_context.user.id)},
     )
     
-    return DepositResponse(
+    return MsgspecResponse(DepositResponse(
         reference=reference,
         authorization_url=paystack_response["data"]["authorization_url"],
         amount=payload.amount,
-    )
+    ))
 
 
-@router.get("/deposit/{reference}/status", response_model=DepositStatusResponse)
+@router.get("/deposit/{reference}/status", response_class=MsgspecResponse, responses=msgspec_responses(DepositStatusResponse))
 async def deposit_status(
     request: Request,
     reference: str,
     session: AsyncSession = Depends(get_db),
-    token: str = Depends(security),
-    api_key: str = Depends(api_key_header),
+    auth_context: AuthContext = Depends(require_auth()),
 ):
     """
     Get the status of a deposit transaction.
@@ -104,9 +93,6 @@ async def deposit_status(
     Note: This endpoint does NOT credit wallets. Only webhooks credit wallets.
     Requires authentication to prevent information disclosure.
     """
-    # Authenticate user
-    auth_context = await get_authenticated_user(request)
-    
     # Get transaction
     status_info = await get_deposit_status(reference, session)
     
@@ -121,19 +107,18 @@ async def deposit_status(
             detail="You don't have permission to view this transaction"
         )
     
-    return DepositStatusResponse(
+    return MsgspecResponse(DepositStatusResponse(
         reference=status_info["reference"],
         status=status_info["status"],
         amount=status_info["amount"],
-    )
+    ))
 
 
-@router.get("/balance", response_model=BalanceResponse)
+@router.get("/balance", response_class=MsgspecResponse, responses=msgspec_responses(BalanceResponse))
 async def get_balance(
     request: Request,
     session: AsyncSession = Depends(get_db),
-    token: str = Depends(security),
-    api_key: str = Depends(api_key_header),
+    auth_context: AuthContext = Depends(require_auth("read")),
 ):
     """
     Get wallet balance.
@@ -141,78 +126,59 @@ async def get_balance(
     Auth: JWT or API key with "read" permission
 
     """
-    # Check permission if API key
-    if request.headers.get("x-api-key"):
-        auth_context = await get_authenticated_user(request, required_permission="read")
-    else:
-        auth_context = await get_authenticated_user(request)
-    
-    # Get wallet
-    wallet = await get_or_create_wallet(auth_context.user, session)
-    await session.refresh(wallet)
+    # Get wallet (polled often; served from a few-second cache)
+    wallet_number, balance = await get_cached_balance(auth_context.user, session)
     
-    return BalanceResponse(
-        wallet_number=wallet.wallet_number,
-        balance=wallet.balance,
-    )
+    return MsgspecResponse(BalanceResponse(
+        wallet_number=wallet_number,
+        balance=balance,
+    ))
 
 
-@router.post("/transfer", response_model=TransferResponse)
+@router.post("/transfer", response_class=MsgspecResponse, responses=msgspec_responses(TransferResponse))
 @limiter.limit("20/minute")  # Max 20 transfers per minute per IP
 async def transfer(
     request: Request,
     payload: TransferRequest,
     session: AsyncSession = Depends(get_db),
-    token: str = Depends(security),
-    api_key: str = Depends(api_key_header),
+    auth_context: AuthContext = Depends(require_auth("transfer")),
 ):
     """
     Transfer funds to another wallet.
     
     Auth: JWT or API key with "transfer" permission
     """
-    # Check permission if API key
-    if request.headers.get("x-api-key"):
-        auth_context = await get_authenticated_user(request, required_permission="transfer")
-    else:
-        auth_context = await get_authenticated_user(request)
-    
     # Perform transfer (atomic)
-    transaction = await transfer_funds(
+    transaction, recipient_transaction = await transfer_funds(
         sender_user=auth_context.user,
         recipient_wallet_number=payload.wallet_number,
         amount=payload.amount,
         session=session,
     )
     await session.commit()
+    # Only drop the cached balances once the new ones are visible
+    invalidate_balance(transaction.user_id, recipient_transaction.user_id)
     
-    return TransferResponse(
+    return MsgspecResponse(TransferResponse(
         status="success",
         message="Transfer completed",
         transaction_id=transaction.id,
-    )
+    ))
 
 
-@router.get("/transactions", response_model=TransactionHistoryResponse)
+@router.get("/transactions", response_class=MsgspecResponse, responses=msgspec_responses(TransactionHistoryResponse))
 async def get_transactions(
     request: Request,
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
     session: AsyncSession = Depends(get_db),
-    token: str = Depends(security),
-    api_key: str = Depends(api_key_header),
+    auth_context: AuthContext = Depends(require_auth("read")),
 ):
     """
     Get transaction history for the user.
     
     Auth: JWT or API key with "read" permission
     """
-    # Check permission if API key
-    if request.headers.get("x-api-key"):
-        auth_context = await get_authenticated_user(request, required_permission="read")
-    else:
-        auth_context = await get_authenticated_user(request)
-    
     transactions, total_count = await get_transaction_history(
         user_id=auth_context.user.id,
         session=session,
@@ -220,7 +186,7 @@ async def get_transactions(
         offset=offset,
     )
     
-    return TransactionHistoryResponse(
-        transactions=transactions,
+    return MsgspecResponse(TransactionHistoryResponse(
+        transactions=msgspec.convert(transactions, list[TransactionResponse], from_attributes=True),
         count=total_count,
-    )
+    ))
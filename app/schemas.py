@@ -1,7 +1,20 @@
 from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
-from typing import Optional, List
+from typing import Annotated, Optional, List
 from uuid import UUID
+import msgspec
+
+
+# Response-only shapes on hot endpoints are msgspec Structs: they are built
+# directly in the routes and encoded by MsgspecResponse without a Pydantic
+# validation + dump pass. Request bodies stay Pydantic for validation.
+
+
+# Positive amount in kobo, capped at NGN 10,000,000 per request
+KoboAmount = Annotated[int, Field(gt=0, le=1_000_000_000)]
+
+# Wallet numbers are 13 digits (see generate_wallet_number)
+WalletNumber = Annotated[str, Field(pattern=r"^\d{13}$")]
 
 
 # ============== Auth Schemas ==============
@@ -47,7 +60,7 @@ class WalletBase(BaseModel):
 class WalletResponse(BaseModel):
     id: UUID
     wallet_number: str
-    balance: float
+    balance: int  # kobo
     currency: str
     created_at: datetime
     updated_at: datetime
@@ -56,25 +69,22 @@ class WalletResponse(BaseModel):
         from_attributes = True
 
 
-class BalanceResponse(BaseModel):
+class BalanceResponse(msgspec.Struct):
     wallet_number: str
-    balance: float
+    balance: int  # kobo
 
 
 # ============== Transaction Schemas ==============
 
-class TransactionResponse(BaseModel):
+class TransactionResponse(msgspec.Struct):
     id: UUID
     type: str
-    amount: float
+    amount: int  # kobo
     status: str
     created_at: datetime
-    
-    class Config:
-        from_attributes = True
 
 
-class TransactionHistoryResponse(BaseModel):
+class TransactionHistoryResponse(msgspec.Struct):
     transactions: List[TransactionResponse]
     count: int
 
@@ -82,19 +92,22 @@ class TransactionHistoryResponse(BaseModel):
 # ============== Paystack Schemas ==============
 
 class DepositRequest(BaseModel):
-    amount: float
+    amount: KoboAmount
+    
+    class Config:
+        extra = "forbid"
 
 
-class DepositResponse(BaseModel):
+class DepositResponse(msgspec.Struct):
     reference: str
     authorization_url: str
-    amount: float
+    amount: int  # kobo
 
 
-class DepositStatusResponse(BaseModel):
+class DepositStatusResponse(msgspec.Struct):
     reference: str
     status: str
-    amount: float
+    amount: int  # kobo
 
 
 class PaystackWebhookData(BaseModel):
@@ -105,11 +118,15 @@ class PaystackWebhookData(BaseModel):
 # ============== Transfer Schemas ==============
 
 class TransferRequest(BaseModel):
-    wallet_number: str
-    amount: float
+    wallet_number: WalletNumber
+    amount: KoboAmount
+    
+    class Config:
+        extra = "forbid"
+        str_strip_whitespace = True
 
 
-class TransferResponse(BaseModel):
+class TransferResponse(msgspec.Struct):
     status: str
     message: str
     transaction_id: Optional[UUID] = None
@@ -139,7 +156,7 @@ class RolloverAPIKeyResponse(BaseModel):
     expires_at: datetime
 
 
-class APIKeyListItem(BaseModel):
+class APIKeyListItem(msgspec.Struct):
     id: UUID
     name: str
     permissions: List[str]
@@ -147,12 +164,9 @@ class APIKeyListItem(BaseModel):
     is_revoked: bool
     expires_at: datetime
     created_at: datetime
-    
-    class Config:
-        from_attributes = True
 
 
-class APIKeyListResponse(BaseModel):
+class APIKeyListResponse(msgspec.Struct):
     keys: List[APIKeyListItem]
     count: int
 
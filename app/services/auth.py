@@ -1,15 +1,28 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func, lambda_stmt
+from sqlalchemy.orm import joinedload
+from app.config.settings import settings
 from app.models import User, APIKey
-from app.utils.security import verify_api_key, verify_jwt
+from app.utils.security import (
+    verify_api_key,
+    verify_jwt,
+    api_key_lookup,
+    hash_api_key,
+)
 from app.utils.exceptions import (
     InvalidAPIKeyException,
     MissingPermissionException,
     InvalidJWTException,
     UserNotFoundException,
+    RateLimitExceededException,
 )
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Optional, Tuple
+from cachetools import TTLCache
+from limits import parse
+from limits.aio.storage import MemoryStorage
+from limits.aio.strategies import MovingWindowRateLimiter
+import asyncio
 
 
 async def verify_jwt_token(token: str, session: AsyncSession) -> Tuple[User, str]:
@@ -34,7 +47,7 @@ async def verify_jwt_token(token: str, session: AsyncSession) -> Tuple[User, str
         raise InvalidJWTException("Invalid JWT token structure")
     
     # Fetch user from database
-    result = await session.execute(select(User).where(User.id == user_id))
+    result = await session.execute(lambda_stmt(lambda: select(User).where(User.id == user_id)))
     user = result.scalar_one_or_none()
     
     if not user:
@@ -47,7 +60,7 @@ async def verify_api_key_auth(
     api_key: str,
     session: AsyncSession,
     required_permission: Optional[str] = None,
-) -> Tuple[User, str]:
+) -> Tuple[User, str, APIKey]:
     """
     Verify API key and return user.
     
@@ -57,48 +70,125 @@ async def verify_api_key_auth(
         required_permission: Optional permission to check (e.g., "deposit")
     
     Returns:
-        Tuple of (User object, user_id)
+        Tuple of (User object, user_id, matching APIKey record)
     
     Raises:
         InvalidAPIKeyException
         MissingPermissionException
-        UserNotFoundException
     """
-    # Search for API key in database (need to check all hashes)
+    # One indexed lookup finds the candidate (and its user); key_hash then confirms it.
+    # lambda_stmt caches the built statement; only the lookup value is bound.
+    lookup = api_key_lookup(api_key)
     result = await session.execute(
-        select(APIKey).where(
-            APIKey.is_active == True,
-            APIKey.is_revoked == False,
+        lambda_stmt(
+            lambda: select(APIKey)
+            .options(joinedload(APIKey.user, innerjoin=True))
+            .where(APIKey.key_lookup == lookup)
         )
     )
-    api_keys = result.scalars().all()
+    found_key = result.scalar_one_or_none()
+    
+    if found_key:
+        # A known key is decided here; revoked keys never reach the legacy scan
+        if not verify_api_key(api_key, found_key.key_hash):
+            raise InvalidAPIKeyException("Invalid API key")
+        if found_key.is_revoked or not found_key.is_active:
+            raise InvalidAPIKeyException("API key has been revoked")
+    else:
+        # Keys issued before key_lookup existed have no lookup value yet
+        found_key = await _find_legacy_api_key(api_key, lookup, session)
+        if not found_key:
+            raise InvalidAPIKeyException("Invalid API key")
+    
+    check_api_key(found_key, required_permission)
+    
+    return found_key.user, str(found_key.user_id), found_key
+
+
+# Bounds on the bcrypt scan for keys issued before key_lookup existed.
+# Lookup values that matched no legacy key are remembered, and each worker
+# gets a fixed scan budget, so random keys can't turn every request into a
+# scan. No new key is ever stored without a key_lookup, so once a worker
+# finds none left it stops looking for good.
+_legacy_misses: TTLCache = TTLCache(maxsize=10_000, ttl=600)
+_legacy_scan_limit = parse(settings.API_KEY_LEGACY_SCAN_LIMIT)
+_legacy_scan_limiter = MovingWindowRateLimiter(MemoryStorage())
+_legacy_keys_remaining = True
+
+
+async def _find_legacy_api_key(api_key: str, lookup: str, session: AsyncSession) -> Optional[APIKey]:
+    """
+    Find a key issued before key_lookup existed (bcrypt key_hash, NULL
+    key_lookup) by checking the presented key against each such usable key.
+    
+    A match is upgraded in place (key_lookup set, key_hash rehashed with
+    HMAC), so each legacy key is scanned for at most once.
+    
+    Raises:
+        RateLimitExceededException: this worker's scan budget is used up
+    """
+    global _legacy_keys_remaining
     
-    found_key = None
-    for stored_key in api_keys:
-        if verify_api_key(api_key, stored_key.key_hash):
-            found_key = stored_key
-            break
+    if not _legacy_keys_remaining or lookup in _legacy_misses:
+        return None
+    if not await _legacy_scan_limiter.hit(_legacy_scan_limit, "legacy_api_key_scan"):
+        raise RateLimitExceededException(_legacy_scan_limit)
     
+    result = await session.execute(
+        select(APIKey)
+        .options(joinedload(APIKey.user, innerjoin=True))
+        .where(
+            APIKey.key_lookup.is_(None),
+            APIKey.is_active == True,
+            APIKey.is_revoked == False,
+            APIKey.expires_at > func.now(),
+        )
+    )
+    candidates = [(key, key.key_hash) for key in result.scalars()]
+    if not candidates:
+        _legacy_keys_remaining = False
+        return None
+    
+    def match() -> Optional[APIKey]:
+        for key, key_hash in candidates:
+            if verify_api_key(api_key, key_hash):
+                return key
+        return None
+    
+    # bcrypt is deliberately slow; keep it off the event loop
+    found_key = await asyncio.to_thread(match)
     if not found_key:
-        raise InvalidAPIKeyException("Invalid API key")
+        _legacy_misses[lookup] = True
+        return None
+    
+    # Authentication runs before the route touches the session, so this
+    # commit carries only the upgrade (read-only routes never commit)
+    found_key.key_lookup = lookup
+    found_key.key_hash = hash_api_key(api_key)
+    await session.commit()
+    return found_key
+
+
+def check_api_key(stored_key: APIKey, required_permission: Optional[str] = None) -> None:
+    """
+    Check that a verified API key is still usable.
     
+    Args:
+        stored_key: APIKey record matching the presented key
+        required_permission: Optional permission to check (e.g., "deposit")
+    
+    Raises:
+        InvalidAPIKeyException
+        MissingPermissionException
+    """
     # Check expiry
-    if found_key.expires_at < datetime.utcnow():
+    if stored_key.expires_at < datetime.now(timezone.utc):
         raise InvalidAPIKeyException("API key has expired")
     
     # Check permission if required
     if required_permission:
-        if required_permission not in found_key.permissions:
+        if required_permission not in stored_key.permissions:
             raise MissingPermissionException(required_permission)
-    
-    # Fetch user
-    result = await session.execute(select(User).where(User.id == found_key.user_id))
-    user = result.scalar_one_or_none()
-    
-    if not user:
-        raise UserNotFoundException()
-    
-    return user, str(found_key.user_id)
 
 
 async def get_auth_user(
@@ -106,7 +196,7 @@ async def get_auth_user(
     api_key: Optional[str] = None,
     session: Optional[AsyncSession] = None,
     required_permission: Optional[str] = None,
-) -> Tuple[User, str]:
+) -> Tuple[User, str, Optional[APIKey]]:
     """
     Get authenticated user from JWT or API key.
     
@@ -117,13 +207,14 @@ async def get_auth_user(
         required_permission: Optional permission to check
     
     Returns:
-        Tuple of (User object, user_id)
+        Tuple of (User object, user_id, APIKey record or None for JWT auth)
     
     Raises:
         InvalidJWTException or InvalidAPIKeyException
     """
     if token:
-        return await verify_jwt_token(token, session)
+        user, user_id = await verify_jwt_token(token, session)
+        return user, user_id, None
     elif api_key:
         return await verify_api_key_auth(api_key, session, required_permission)
     else:
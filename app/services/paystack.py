@@ -1,27 +1,133 @@
+import asyncio
 import httpx
+import orjson
+from contextlib import asynccontextmanager
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update, lambda_stmt, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from app.config.settings import settings
+from app.config.database import async_session
 from app.models import Transaction, Wallet, TransactionStatus, PaystackWebhookLog
 from app.utils.exceptions import WalletNotFoundException, TransactionNotFoundException
-from datetime import datetime
+from app.utils.logger import logger
 from typing import Optional
 from uuid import UUID
-import json
+
+
+@asynccontextmanager
+async def paystack_client_lifespan(app):
+    """
+    Share one Paystack HTTP client for the lifetime of the app, so deposits
+    reuse pooled keep-alive connections instead of a new TCP+TLS handshake.
+    """
+    async with httpx.AsyncClient(
+        base_url=settings.PAYSTACK_BASE_URL,
+        headers={"Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}"},
+        http2=True,
+        timeout=httpx.Timeout(10.0, connect=3.0),
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+    ) as client:
+        app.state.paystack_client = client
+        yield
+
+
+# Audit rows for webhook events the handler doesn't act on are queued and
+# written in batches by one background task, off the request path
+WEBHOOK_LOG_QUEUE_SIZE = 10_000
+WEBHOOK_LOG_BATCH_SIZE = 200
+_WEBHOOK_EVENT_MAX_LENGTH = PaystackWebhookLog.__table__.c.event.type.length
+_WEBHOOK_REFERENCE_MAX_LENGTH = PaystackWebhookLog.__table__.c.reference.type.length
+
+
+@asynccontextmanager
+async def webhook_log_writer_lifespan(app):
+    """
+    Run the batched webhook-log writer for the lifetime of the app.
+    
+    Rows queued on app.state.webhook_log_queue are flushed before shutdown.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=WEBHOOK_LOG_QUEUE_SIZE)
+    writer = asyncio.create_task(_write_webhook_logs(queue))
+    app.state.webhook_log_queue = queue
+    try:
+        yield
+    finally:
+        await queue.join()
+        writer.cancel()
+
+
+async def _write_webhook_logs(queue: asyncio.Queue) -> None:
+    """Drain the queue, inserting up to WEBHOOK_LOG_BATCH_SIZE rows per statement."""
+    while True:
+        rows = [await queue.get()]
+        while len(rows) < WEBHOOK_LOG_BATCH_SIZE:
+            try:
+                rows.append(queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        
+        try:
+            await _insert_webhook_logs(rows)
+        except Exception as e:
+            # Retry one row at a time so a single bad row can't take the
+            # rest of the batch down with it
+            logger.error(f"Failed to write {len(rows)} webhook log(s), retrying individually: {e}")
+            for row in rows:
+                try:
+                    await _insert_webhook_logs([row])
+                except Exception as e:
+                    logger.error(
+                        f"Failed to write webhook log for event={row['event']} reference={row['reference']}: {e}",
+                        exc_info=True,
+                    )
+        finally:
+            for _ in rows:
+                queue.task_done()
+
+
+async def _insert_webhook_logs(rows: list) -> None:
+    async with async_session() as session:
+        # Retried deliveries of an already-logged event are skipped
+        await session.execute(
+            pg_insert(PaystackWebhookLog).on_conflict_do_nothing(
+                index_elements=["reference", "event"]
+            ),
+            rows,
+        )
+        await session.commit()
+
+
+def enqueue_webhook_log(app, event: Optional[str], reference: Optional[str], payload: dict) -> None:
+    """Queue an audit row for an event the webhook handler ignores."""
+    # Rows that can't be inserted are dropped here rather than failing the batch
+    if not isinstance(event, str) or not event or len(event) > _WEBHOOK_EVENT_MAX_LENGTH:
+        logger.warning(f"Skipping webhook log with invalid event={event!r} reference={reference!r}")
+        return
+    if reference is not None and (not isinstance(reference, str) or len(reference) > _WEBHOOK_REFERENCE_MAX_LENGTH):
+        logger.warning(f"Skipping webhook log with invalid reference={reference!r} event={event}")
+        return
+    
+    try:
+        app.state.webhook_log_queue.put_nowait({
+            "event": event,
+            "reference": reference,
+            "payload": payload,
+            "processed": True,
+        })
+    except asyncio.QueueFull:
+        logger.warning(f"Webhook log queue full; dropping log for event={event} reference={reference}")
 
 
 class PaystackService:
     """Service for handling Paystack API interactions."""
     
-    def __init__(self):
-        self.base_url = settings.PAYSTACK_BASE_URL
-        self.secret_key = settings.PAYSTACK_SECRET_KEY
-        self.public_key = settings.PAYSTACK_PUBLIC_KEY
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
     
     async def initialize_transaction(
         self,
         email: str,
-        amount: float,
+        amount: int,
         reference: str,
         meta: Optional[dict] = None,
     ) -> dict:
@@ -30,36 +136,30 @@ class PaystackService:
         
         Args:
             email: Customer email
-            amount: Amount in kobo (multiply by 100)
+            amount: Amount in kobo
             reference: Unique transaction reference
             meta: Additional metadata
         
         Returns:
             dict with authorization_url and other details
         """
-        headers = {
-            "Authorization": f"Bearer {self.secret_key}",
-            "Content-Type": "application/json",
-        }
-        
         payload = {
             "email": email,
-            "amount": int(amount * 100),  # Convert to kobo
+            "amount": amount,
             "reference": reference,
             "metadata": meta or {},
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/transaction/initialize",
-                json=payload,
-                headers=headers,
-            )
-            
-            if response.status_code != 200:
-                raise Exception(f"Paystack error: {response.text}")
-            
-            return response.json()
+        response = await self.client.post(
+            "/transaction/initialize",
+            content=orjson.dumps(payload),
+            headers={"Content-Type": "application/json"},
+        )
+        
+        if response.status_code != 200:
+            raise Exception(f"Paystack error: {response.text}")
+        
+        return orjson.loads(response.content)
     
     async def verify_transaction(self, reference: str) -> dict:
         """
@@ -71,20 +171,12 @@ class PaystackService:
         Returns:
             dict with transaction status and details
         """
-        headers = {
-            "Authorization": f"Bearer {self.secret_key}",
-        }
+        response = await self.client.get(f"/transaction/verify/{reference}")
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/transaction/verify/{reference}",
-                headers=headers,
-            )
-            
-            if response.status_code != 200:
-                raise Exception(f"Paystack error: {response.text}")
-            
-            return response.json()
+        if response.status_code != 200:
+            raise Exception(f"Paystack error: {response.text}")
+        
+        return orjson.loads(response.content)
 
 
 async def get_transaction_by_reference(
@@ -93,7 +185,7 @@ async def get_transaction_by_reference(
 ) -> Transaction:
     """Get transaction by Paystack reference."""
     result = await session.execute(
-        select(Transaction).where(Transaction.reference == reference)
+        lambda_stmt(lambda: select(Transaction).where(Transaction.reference == reference))
     )
     transaction = result.scalar_one_or_none()
     
@@ -121,33 +213,46 @@ async def credit_wallet(
         TransactionNotFoundException
         WalletNotFoundException
     """
-    # Get transaction
-    result = await session.execute(
-        select(Transaction).where(Transaction.id == transaction_id)
+    # Serialise credits for this transaction across concurrent webhook
+    # deliveries; the lock is released when the surrounding transaction ends
+    await session.execute(
+        text("SELECT pg_advisory_xact_lock(hashtextextended(:k, 0))"),
+        {"k": str(transaction_id)},
     )
-    transaction = result.scalar_one_or_none()
+    
+    # Mark the transaction successful and read back its amount and wallet.
+    # Only a transaction not yet marked successful is credited, so a retry
+    # that got past the webhook log still can't credit twice.
+    result = await session.scalars(
+        update(Transaction)
+        .where(
+            Transaction.id == transaction_id,
+            Transaction.status != TransactionStatus.SUCCESS,
+        )
+        .values(status=TransactionStatus.SUCCESS)
+        .returning(Transaction),
+        execution_options={"populate_existing": True},
+    )
+    transaction = result.one_or_none()
     
     if not transaction:
-        raise TransactionNotFoundException()
+        transaction = await session.get(Transaction, transaction_id)
+        if not transaction:
+            raise TransactionNotFoundException()
+        # Already credited
+        return transaction
     
-    # Get wallet
+    # Increment the balance in the database; no read-modify-write in Python
     result = await session.execute(
-        select(Wallet).where(Wallet.id == transaction.wallet_id)
+        update(Wallet)
+        .where(Wallet.id == transaction.wallet_id)
+        .values(balance=Wallet.balance + transaction.amount)
+        .returning(Wallet.id)
     )
-    wallet = result.scalar_one_or_none()
     
-    if not wallet:
+    if result.scalar_one_or_none() is None:
         raise WalletNotFoundException()
     
-    # Update wallet balance
-    wallet.balance += transaction.amount
-    wallet.updated_at = datetime.utcnow()
-    
-    # Update transaction status
-    transaction.status = TransactionStatus.SUCCESS
-    transaction.updated_at = datetime.utcnow()
-    
-    await session.flush()
     return transaction
 
 
@@ -167,16 +272,13 @@ async def update_transaction_status(
     Returns:
         Updated Transaction object
     """
-    result = await session.execute(
-        select(Transaction).where(Transaction.id == transaction_id)
-    )
-    transaction = result.scalar_one_or_none()
+    # The webhook has usually just loaded this transaction; get() reuses it
+    transaction = await session.get(Transaction, transaction_id)
     
     if not transaction:
         raise TransactionNotFoundException()
         
     transaction.status = status
-    transaction.updated_at = datetime.utcnow()
     
     await session.flush()
     return transaction
@@ -187,10 +289,7 @@ async def mark_webhook_processed(
     session: AsyncSession,
 ) -> PaystackWebhookLog:
     """Mark a webhook as processed."""
-    result = await session.execute(
-        select(PaystackWebhookLog).where(PaystackWebhookLog.id == webhook_log_id)
-    )
-    webhook_log = result.scalar_one_or_none()
+    webhook_log = await session.get(PaystackWebhookLog, webhook_log_id)
     
     if webhook_log:
         webhook_log.processed = True
@@ -205,30 +304,30 @@ async def get_or_create_webhook_log(
     payload: dict,
     session: AsyncSession,
 ) -> PaystackWebhookLog:
-    """Get existing webhook log or create a new one."""
-    # Check if already processed
-    if reference:
-        result = await session.execute(
-            select(PaystackWebhookLog).where(
-                PaystackWebhookLog.reference == reference,
-                PaystackWebhookLog.event == event,
-            )
-        )
-        existing = result.scalar_one_or_none()
-        
-        if existing:
-            return existing
+    """
+    Get existing webhook log or create a new one.
     
-    # Create new log
-    webhook_log = PaystackWebhookLog(
+    A single INSERT ... ON CONFLICT DO UPDATE ... RETURNING either creates the
+    log or returns the existing row, so duplicates cost one round-trip and
+    two concurrent deliveries of the same event can't both create a log. The
+    no-op update also locks an existing row, so a concurrent duplicate waits
+    for the first delivery to commit and then sees its processed flag.
+    """
+    stmt = pg_insert(PaystackWebhookLog).values(
         event=event,
         reference=reference,
         payload=payload,
         processed=False,
     )
-    session.add(webhook_log)
-    await session.flush()
-    return webhook_log
+    result = await session.scalars(
+        stmt.on_conflict_do_update(
+            index_elements=["reference", "event"],
+            set_={"reference": stmt.excluded.reference},
+        )
+        .returning(PaystackWebhookLog),
+        execution_options={"populate_existing": True},
+    )
+    return result.one()
 
 
 async def get_deposit_status(
@@ -1,6 +1,7 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func
+from sqlalchemy import select, update, and_, or_, case, func, lambda_stmt
 from sqlalchemy.orm import selectinload
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from app.models import (
     User,
     Wallet,
@@ -16,59 +17,75 @@ from app.utils.exceptions import (
     APIKeyLimitExceededException,
     KeyNotExpiredException,
 )
-from app.utils.security import generate_api_key, hash_api_key, parse_expiry
+from app.utils.security import generate_api_key, hash_api_key, api_key_lookup, parse_expiry
 from app.config.settings import settings
-from datetime import datetime, timedelta
-from typing import List, Optional
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
 from uuid import UUID
+from cachetools import TTLCache
 import secrets
-import string
-import uuid
+from uuid_utils.compat import uuid7
+
+
+# Recently read balances: user_id -> (wallet_number, balance in kobo).
+# Per process; this process drops an entry whenever it moves the user's
+# money, and the short TTL bounds staleness from credits made elsewhere.
+_balance_cache: TTLCache = TTLCache(maxsize=50_000, ttl=5)
 
 
 async def get_or_create_wallet(user: User, session: AsyncSession) -> Wallet:
     """Get user's wallet or create one if doesn't exist."""
-    # Check if wallet exists
+    # Check if wallet exists (lambda_stmt caches the built statement)
+    user_id = user.id
     result = await session.execute(
-        select(Wallet).where(Wallet.user_id == user.id)
+        lambda_stmt(lambda: select(Wallet).where(Wallet.user_id == user_id))
     )
     wallet = result.scalar_one_or_none()
     
     if wallet:
         return wallet
     
-    # Create new wallet
-    wallet_number = generate_wallet_number()
-    wallet = Wallet(
+    # Create new wallet in one INSERT ... RETURNING. If a concurrent request
+    # created it first, the no-op update returns that wallet instead.
+    stmt = pg_insert(Wallet).values(
         user_id=user.id,
-        wallet_number=wallet_number,
-        balance=0.0,
+        wallet_number=generate_wallet_number(),
+        balance=0,
         currency="NGN",
     )
-    session.add(wallet)
-    await session.flush()
-    await session.commit() 
-    await session.refresh(wallet) 
+    result = await session.scalars(
+        stmt.on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={"user_id": stmt.excluded.user_id},
+        )
+        .returning(Wallet),
+        execution_options={"populate_existing": True},
+    )
+    wallet = result.one()
+    await session.commit()
     return wallet
 
 
-def generate_wallet_number() -> str:
-    """Generate unique 13-digit wallet number."""
-    # Could use a more sophisticated algorithm
-    return "".join(secrets.choice(string.digits) for _ in range(13))
+async def get_cached_balance(user: User, session: AsyncSession) -> Tuple[str, int]:
+    """Get (wallet_number, balance) for a user, served from a short-lived cache."""
+    cached = _balance_cache.get(user.id)
+    if cached is None:
+        wallet = await get_or_create_wallet(user, session)
+        cached = _balance_cache[user.id] = (wallet.wallet_number, wallet.balance)
+    return cached
 
 
-async def get_wallet_balance(wallet_id: UUID, session: AsyncSession) -> float:
-    """Get current wallet balance."""
-    result = await session.execute(
-        select(Wallet).where(Wallet.id == wallet_id)
-    )
-    wallet = result.scalar_one_or_none()
-    
-    if not wallet:
-        raise WalletNotFoundException()
-    
-    return wallet.balance
+def invalidate_balance(*user_ids: UUID) -> None:
+    """Drop cached balances after money moves for these users."""
+    for user_id in user_ids:
+        _balance_cache.pop(user_id, None)
+
+
+def generate_wallet_number() -> str:
+    """Generate unique 13-digit wallet number."""
+    # One draw covers all 13 digits (zero-padded); same distribution as
+    # picking each digit separately
+    return f"{secrets.randbelow(10**13):013d}"
 
 
 async def get_transaction_history(
@@ -77,31 +94,51 @@ async def get_transaction_history(
     limit: int = 50,
     offset: int = 0,
 ) -> tuple:
-    """Get transaction history for a user."""
-    # Get transactions
-    result = await session.execute(
-        select(Transaction)
-        .where(Transaction.user_id == user_id)
-        .order_by(Transaction.created_at.desc())
-        .limit(limit)
-        .offset(offset)
-    )
-    transactions = result.scalars().all()
+    """
+    Get transaction history for a user.
     
-    # Get total count
-    count_result = await session.execute(
-        select(func.count(Transaction.id)).where(Transaction.user_id == user_id)
+    Returns plain rows (id, type, amount, status, created_at) rather than ORM
+    objects, so a page of history skips identity-map bookkeeping.
+    """
+    # Page and total count in one query via COUNT(*) OVER ();
+    # lambda_stmt caches the built statement, binding user_id/limit/offset
+    result = await session.execute(
+        lambda_stmt(
+            lambda: select(
+                Transaction.id,
+                Transaction.type,
+                Transaction.amount,
+                Transaction.status,
+                Transaction.created_at,
+                func.count().over().label("total_count"),
+            )
+            .where(Transaction.user_id == user_id)
+            .order_by(Transaction.created_at.desc())
+            .limit(limit)
+            .offset(offset)
+        )
     )
-    total_count = count_result.scalar()
+    rows = result.all()
+    
+    if rows:
+        total_count = rows[0].total_count
+    elif offset:
+        # Paged past the end: no row to carry the window count
+        count_result = await session.execute(
+            select(func.count(Transaction.id)).where(Transaction.user_id == user_id)
+        )
+        total_count = count_result.scalar()
+    else:
+        total_count = 0
     
-    return transactions, total_count
+    return rows, total_count
 
 
 async def create_transaction(
     user_id: UUID,
     wallet_id: UUID,
     transaction_type: TransactionType,
-    amount: float,
+    amount: int,
     session: AsyncSession,
     status: TransactionStatus = TransactionStatus.PENDING,
     reference: Optional[str] = None,
@@ -109,7 +146,7 @@ async def create_transaction(
     description: Optional[str] = None,
     meta: Optional[dict] = None,
 ) -> Transaction:
-    """Create a new transaction record."""
+    """Create a new transaction record (inserted on the session's next flush or commit)."""
     transaction = Transaction(
         user_id=user_id,
         wallet_id=wallet_id,
@@ -122,106 +159,128 @@ async def create_transaction(
         meta=meta or {},
     )
     session.add(transaction)
-    await session.flush()
     return transaction
 
 
 async def transfer_funds(
     sender_user: User,
     recipient_wallet_number: str,
-    amount: float,
+    amount: int,
     session: AsyncSession,
-) -> Transaction:
+) -> Tuple[Transaction, Transaction]:
     """
     Transfer funds from sender's wallet to recipient's wallet.
     
     Args:
         sender_user: Sender User object
         recipient_wallet_number: Recipient's wallet number
-        amount: Amount to transfer
+        amount: Amount to transfer, in kobo
         session: AsyncSession for database
     
     Returns:
-        Transaction object
+        Tuple of (sender transaction, recipient transaction)
     
     Raises:
         WalletNotFoundException
         InsufficientBalanceException
         InvalidRecipientException
     """
-    # Get sender's wallet
+    # Debit the sender (only if the balance covers it) and credit the
+    # recipient in one statement; the balance check and the write can't be
+    # split by a concurrent transfer. Any failure below raises before the
+    # route commits, so a partial or self transfer is rolled back.
+    is_sender = Wallet.user_id == sender_user.id
     result = await session.execute(
-        select(Wallet).where(Wallet.user_id == sender_user.id)
+        update(Wallet)
+        .where(
+            or_(
+                and_(is_sender, Wallet.balance >= amount),
+                Wallet.wallet_number == recipient_wallet_number,
+            )
+        )
+        .values(
+            balance=case(
+                (is_sender, Wallet.balance - amount),
+                else_=Wallet.balance + amount,
+            )
+        )
+        .returning(Wallet.id, Wallet.user_id, Wallet.wallet_number)
     )
-    sender_wallet = result.scalar_one_or_none()
+    sender_wallet = recipient_wallet = None
+    for row in result:
+        if row.user_id == sender_user.id:
+            sender_wallet = row
+        else:
+            recipient_wallet = row
     
     if not sender_wallet:
-        raise WalletNotFoundException()
-    
-    # Check balance
-    if sender_wallet.balance < amount:
+        # Find out which condition failed
+        result = await session.execute(
+            select(Wallet.wallet_number).where(Wallet.user_id == sender_user.id)
+        )
+        sender_wallet_number = result.scalar_one_or_none()
+        if sender_wallet_number is None:
+            raise WalletNotFoundException()
+        if sender_wallet_number == recipient_wallet_number:
+            raise InvalidRecipientException()
         raise InsufficientBalanceException()
     
-    # Get recipient's wallet
-    result = await session.execute(
-        select(Wallet).where(Wallet.wallet_number == recipient_wallet_number)
-    )
-    recipient_wallet = result.scalar_one_or_none()
-    
+    # Unknown recipient, or the sender's own wallet
     if not recipient_wallet:
         raise InvalidRecipientException()
     
-    # Prevent self-transfer
-    if sender_wallet.id == recipient_wallet.id:
-        raise InvalidRecipientException()
-    
-    # Perform transfer (atomic)
-    sender_wallet.balance -= amount
-    recipient_wallet.balance += amount
-    sender_wallet.updated_at = datetime.utcnow()
-    recipient_wallet.updated_at = datetime.utcnow()
-    
-    
     # Generate unique reference for this transfer
-    transfer_reference = f"transfer_{uuid.uuid4().hex[:12]}"
+    transfer_reference = f"transfer_{uuid7().hex}"
     
-    # Record transaction for SENDER (outgoing transfer)
-    sender_transaction = await create_transaction(
+    # Record both sides of the transfer, inserted together in one flush
+    sender_transaction = Transaction(
         user_id=sender_user.id,
         wallet_id=sender_wallet.id,
-        transaction_type=TransactionType.TRANSFER,
+        type=TransactionType.TRANSFER,
         amount=amount,
         status=TransactionStatus.SUCCESS,
         reference=f"{transfer_reference}_out",
         recipient_wallet_id=recipient_wallet.id,
         description=f"Transfer to wallet {recipient_wallet_number}",
-        session=session,
-    )
-    
-
-    result = await session.execute(
-        select(User).where(User.id == recipient_wallet.user_id)
+        meta={},
     )
-    recipient_user = result.scalar_one()
-    
-    recipient_transaction = await create_transaction(
-        user_id=recipient_user.id,
+    recipient_transaction = Transaction(
+        user_id=recipient_wallet.user_id,
         wallet_id=recipient_wallet.id,
-        transaction_type=TransactionType.TRANSFER,
+        type=TransactionType.TRANSFER,
         amount=amount,
         status=TransactionStatus.SUCCESS,
-        reference=f"{transfer_reference}_in",  
-        recipient_wallet_id=sender_wallet.id,  
+        reference=f"{transfer_reference}_in",
+        recipient_wallet_id=sender_wallet.id,
         description=f"Transfer from wallet {sender_wallet.wallet_number}",
-        session=session,
+        meta={},
     )
+    session.add_all([sender_transaction, recipient_transaction])
     
     await session.flush()
-    return sender_transaction
+    return sender_transaction, recipient_transaction
 
 
 # ============== API Key Management ==============
 
+async def _reserve_api_key_slot(user_id: UUID, session: AsyncSession) -> bool:
+    """
+    Count a new key against the user's limit in one conditional UPDATE.
+    
+    Returns False when the count is unknown (NULL) or already at the limit.
+    """
+    result = await session.execute(
+        update(User)
+        .where(
+            User.id == user_id,
+            User.active_api_key_count < settings.API_KEY_MAX_ACTIVE,
+        )
+        .values(active_api_key_count=User.active_api_key_count + 1)
+        .returning(User.active_api_key_count)
+    )
+    return result.scalar_one_or_none() is not None
+
+
 async def create_api_key(
     user_id: UUID,
     name: str,
@@ -246,21 +305,33 @@ async def create_api_key(
         APIKeyLimitExceededException
         InvalidExpiryFormatException
     """
-    # Check active key count
-    result = await session.execute(
-        select(func.count(APIKey.id)).where(
-            and_(
-                APIKey.user_id == user_id,
-                APIKey.is_active == True,
-                APIKey.is_revoked == False,
-                APIKey.expires_at > datetime.utcnow(),
+    # Take one of the user's key slots
+    if not await _reserve_api_key_slot(user_id, session):
+        # Not counted yet, or at the limit: recount (expired keys drop out)
+        # with the user row locked so concurrent creations can't both pass
+        await session.execute(
+            select(User.id).where(User.id == user_id).with_for_update()
+        )
+        result = await session.execute(
+            select(func.count(APIKey.id)).where(
+                and_(
+                    APIKey.user_id == user_id,
+                    APIKey.is_active == True,
+                    APIKey.is_revoked == False,
+                    APIKey.expires_at > func.now(),
+                )
             )
         )
-    )
-    active_count = result.scalar() or 0
-    
-    if active_count >= settings.API_KEY_MAX_ACTIVE:
-        raise APIKeyLimitExceededException(settings.API_KEY_MAX_ACTIVE)
+        active_count = result.scalar() or 0
+        
+        if active_count >= settings.API_KEY_MAX_ACTIVE:
+            raise APIKeyLimitExceededException(settings.API_KEY_MAX_ACTIVE)
+        
+        await session.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(active_api_key_count=active_count + 1)
+        )
     
     # Parse expiry
     expires_at = parse_expiry(expiry_str)
@@ -273,6 +344,7 @@ async def create_api_key(
     api_key = APIKey(
         user_id=user_id,
         key_hash=key_hash,
+        key_lookup=api_key_lookup(api_key_string),
         name=name,
         permissions=permissions,
         expires_at=expires_at,
@@ -305,19 +377,14 @@ async def rollover_api_key(
         KeyNotExpiredException
         InvalidExpiryFormatException
     """
-    # Get the expired key
-    result = await session.execute(
-        select(APIKey).where(
-            and_(APIKey.id == expired_key_id, APIKey.user_id == user_id)
-        )
-    )
-    old_key = result.scalar_one_or_none()
+    # Get the expired key (by primary key; no query if already in the session)
+    old_key = await session.get(APIKey, expired_key_id)
     
-    if not old_key:
+    if not old_key or old_key.user_id != user_id:
         raise KeyNotExpiredException()
     
     # Check if truly expired
-    if old_key.expires_at > datetime.utcnow():
+    if old_key.expires_at > datetime.now(timezone.utc):
         raise KeyNotExpiredException()
     
     # Reuse permissions
@@ -334,6 +401,7 @@ async def rollover_api_key(
     new_key = APIKey(
         user_id=user_id,
         key_hash=key_hash,
+        key_lookup=api_key_lookup(api_key_string),
         name=old_key.name,
         permissions=permissions,
         expires_at=expires_at,
@@ -342,7 +410,14 @@ async def rollover_api_key(
     
     # Mark old key as revoked
     old_key.is_revoked = True
-    old_key.updated_at = datetime.utcnow()
+    
+    # The new key takes a slot; the expired one stays counted until the
+    # next recount in create_api_key
+    await session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(active_api_key_count=User.active_api_key_count + 1)
+    )
     
     await session.flush()
     return api_key_string, new_key
@@ -351,14 +426,48 @@ async def rollover_api_key(
 async def list_api_keys(
     user_id: UUID,
     session: AsyncSession,
-) -> List[APIKey]:
-    """Get all API keys for a user."""
+    limit: int = 50,
+    offset: int = 0,
+) -> tuple:
+    """
+    Get a page of a user's API keys, newest first.
+    
+    Returns (rows, total_count); rows are plain column tuples, as in
+    get_transaction_history.
+    """
+    # Page and total count in one query via COUNT(*) OVER ()
     result = await session.execute(
-        select(APIKey)
-        .where(APIKey.user_id == user_id)
-        .order_by(APIKey.created_at.desc())
+        lambda_stmt(
+            lambda: select(
+                APIKey.id,
+                APIKey.name,
+                APIKey.permissions,
+                APIKey.is_active,
+                APIKey.is_revoked,
+                APIKey.expires_at,
+                APIKey.created_at,
+                func.count().over().label("total_count"),
+            )
+            .where(APIKey.user_id == user_id)
+            .order_by(APIKey.created_at.desc())
+            .limit(limit)
+            .offset(offset)
+        )
     )
-    return result.scalars().all()
+    rows = result.all()
+    
+    if rows:
+        total_count = rows[0].total_count
+    elif offset:
+        # Paged past the end: no row to carry the window count
+        count_result = await session.execute(
+            select(func.count(APIKey.id)).where(APIKey.user_id == user_id)
+        )
+        total_count = count_result.scalar()
+    else:
+        total_count = 0
+    
+    return rows, total_count
 
 
 async def revoke_api_key(
@@ -367,19 +476,33 @@ async def revoke_api_key(
     session: AsyncSession,
 ) -> APIKey:
     """Revoke an API key."""
+    # Flip the key in one conditional UPDATE: of two concurrent revokes,
+    # only the one that actually revoked it gets a row back
     result = await session.execute(
-        select(APIKey).where(
-            and_(APIKey.id == key_id, APIKey.user_id == user_id)
+        update(APIKey)
+        .where(
+            APIKey.id == key_id,
+            APIKey.user_id == user_id,
+            APIKey.is_revoked == False,
         )
+        .values(is_revoked=True, is_active=False)
+        .returning(APIKey.expires_at > func.now())
     )
-    api_key = result.scalar_one_or_none()
-    
-    if not api_key:
-        raise WalletNotFoundException()
-    
-    api_key.is_revoked = True
-    api_key.is_active = False
-    api_key.updated_at = datetime.utcnow()
+    was_unexpired = result.scalar_one_or_none()
+    
+    if was_unexpired is None:
+        # Not the user's key, or already revoked (nothing to do)
+        api_key = await session.get(APIKey, key_id)
+        if not api_key or api_key.user_id != user_id:
+            raise WalletNotFoundException()
+        return api_key
+    
+    # Free the key's slot if it was still usable (and so still counted)
+    if was_unexpired:
+        await session.execute(
+            update(User)
+            .where(User.id == user_id, User.active_api_key_count > 0)
+            .values(active_api_key_count=User.active_api_key_count - 1)
+        )
     
-    await session.flush()
-    return api_key
+    return await session.get(APIKey, key_id)
@@ -77,3 +77,11 @@ class KeyNotExpiredException(WalletException):
 class InvalidRecipientException(WalletException):
     def __init__(self):
         super().__init__(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid recipient wallet")
+
+
+class RateLimitExceededException(WalletException):
+    def __init__(self, limit):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Rate limit exceeded: {limit}"
+        )
@@ -0,0 +1,80 @@
+from typing import Callable, Optional
+from fastapi import Request
+from limits import RateLimitItem, parse
+from limits.aio.storage import Storage
+from limits.storage import storage_from_string
+from limits.aio.strategies import FixedWindowRateLimiter
+from app.config.settings import settings
+from app.utils.exceptions import RateLimitExceededException
+
+
+def _async_storage(uri: str) -> Storage:
+    """
+    Build an asyncio limits storage from RATE_LIMIT_STORAGE_URI.
+    
+    Plain URIs (memory://, redis://...) are mapped to their async+ variants,
+    so counter updates are awaited instead of blocking the event loop.
+    """
+    if not uri.startswith("async+"):
+        uri = f"async+{uri}"
+    options = {}
+    if uri.startswith("async+redis"):
+        # Use redis-py's asyncio client (already a dependency), not coredis
+        options["implementation"] = "redispy"
+    return storage_from_string(uri, **options)
+
+
+class RateLimiter:
+    """
+    Per-IP rate limiter backed by an async limits storage.
+    
+    Every route gets RATE_LIMIT_DEFAULT unless decorated with @limiter.limit
+    or @limiter.exempt (placed below the route decorator). Limits are
+    enforced by the app-wide `check` dependency, counted per route and IP.
+    """
+    
+    def __init__(self, default_limit: str, storage_uri: str):
+        self.default_limit = parse(default_limit)
+        self._strategy = FixedWindowRateLimiter(_async_storage(storage_uri))
+    
+    def limit(self, limit_string: str) -> Callable:
+        """Give a route its own limit, e.g. "10/minute"."""
+        item = parse(limit_string)
+        
+        def decorator(endpoint: Callable) -> Callable:
+            endpoint._rate_limit = item
+            return endpoint
+        
+        return decorator
+    
+    def exempt(self, endpoint: Callable) -> Callable:
+        """Exclude a route from rate limiting."""
+        endpoint._rate_limit = None
+        return endpoint
+    
+    async def check(self, request: Request) -> None:
+        """
+        Count the request against its route's limit.
+        
+        Raises:
+            RateLimitExceededException
+        """
+        route = request.scope.get("route")
+        item: Optional[RateLimitItem] = getattr(
+            getattr(route, "endpoint", None), "_rate_limit", self.default_limit
+        )
+        if item is None:
+            return
+        
+        # request.client honours X-Forwarded-For from FORWARDED_ALLOW_IPS proxies (uvicorn)
+        client_ip = request.client.host if request.client else "unknown"
+        if not await self._strategy.hit(item, route.path, client_ip):
+            raise RateLimitExceededException(item)
+
+
+# Shared rate limiter. Counters live in RATE_LIMIT_STORAGE_URI; use Redis in
+# production so limits hold across all workers instead of per process.
+limiter = RateLimiter(
+    default_limit=settings.RATE_LIMIT_DEFAULT,
+    storage_uri=settings.RATE_LIMIT_STORAGE_URI,
+)
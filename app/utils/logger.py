@@ -1,8 +1,21 @@
 import logging
 import sys
 from typing import Any
-import json
-from datetime import datetime
+import orjson
+from datetime import datetime, timezone
+
+
+# Structured fields copied from `extra=` when present on a record
+_EXTRA_ATTRS = (
+    "user_id",
+    "transaction_id",
+    "amount",
+    "reference",
+    "event",
+    "paystack_amount",
+    "expected_kobo",
+)
+_MISSING = object()
 
 
 class JSONFormatter(logging.Formatter):
@@ -10,7 +23,8 @@ class JSONFormatter(logging.Formatter):
     
     def format(self, record: logging.LogRecord) -> str:
         log_data = {
-            "timestamp": datetime.utcnow().isoformat(),
+            # record.created is the time logging already captured for the record
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
             "level": record.levelname,
             "message": record.getMessage(),
             "module": record.module,
@@ -19,21 +33,15 @@ class JSONFormatter(logging.Formatter):
         }
         
         # Add extra fields if present
-        if hasattr(record, "user_id"):
-            log_data["user_id"] = record.user_id
-        if hasattr(record, "transaction_id"):
-            log_data["transaction_id"] = record.transaction_id
-        if hasattr(record, "amount"):
-            log_data["amount"] = record.amount
-        if hasattr(record, "reference"):
-            log_data["reference"] = record.reference
-        if hasattr(record, "event"):
-            log_data["event"] = record.event
+        for attr in _EXTRA_ATTRS:
+            value = getattr(record, attr, _MISSING)
+            if value is not _MISSING:
+                log_data[attr] = value
             
         if record.exc_info:
             log_data["exception"] = self.formatException(record.exc_info)
             
-        return json.dumps(log_data)
+        return orjson.dumps(log_data, default=str).decode()
 
 
 def setup_logger(name: str = "wallet_service") -> logging.Logger:
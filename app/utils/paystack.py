@@ -4,31 +4,35 @@ from app.config.settings import settings
 from app.utils.exceptions import InvalidPaystackWebhookException
 
 
-def verify_paystack_webhook(request_body: bytes, signature: str) -> bool:
+# Keyed once at import; copying it skips re-deriving the HMAC pads per webhook
+_webhook_hmac_template = hmac.new(settings.PAYSTACK_SECRET_KEY.encode(), digestmod=hashlib.sha512)
+
+
+def new_webhook_hmac() -> "hmac.HMAC":
     """
-    Verify Paystack webhook signature.
-    
-    Args:
-        request_body: Raw request body bytes
-        signature: X-Paystack-Signature header value
+    Start an HMAC-SHA512 keyed with the Paystack secret.
     
-    Returns:
-        True if signature is valid
+    Feed it the raw request body (in one piece or chunk by chunk) and pass
+    its digest to check_webhook_signature.
+    """
+    return _webhook_hmac_template.copy()
+
+
+def check_webhook_signature(computed_signature: bytes, signature: str) -> bool:
+    """
+    Compare a computed HMAC digest with the X-Paystack-Signature header.
     
     Raises:
         InvalidPaystackWebhookException
     """
+    # Compare raw digests instead of hex strings
+    try:
+        expected_signature = bytes.fromhex(signature)
+    except ValueError:
+        raise InvalidPaystackWebhookException("Webhook signature verification failed")
 
-    hash_object = hmac.new(
-        settings.PAYSTACK_SECRET_KEY.encode(),
-        request_body,
-        hashlib.sha512
-    )
-    
-    computed_signature = hash_object.hexdigest()
-    
-
-    if not hmac.compare_digest(computed_signature, signature):
+    if not hmac.compare_digest(computed_signature, expected_signature):
         raise InvalidPaystackWebhookException("Webhook signature verification failed")
     
     return True
+
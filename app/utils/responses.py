@@ -0,0 +1,32 @@
+import msgspec
+from fastapi.responses import JSONResponse
+from typing import Any, Dict, Type
+
+
+_encoder = msgspec.json.Encoder()
+
+
+class MsgspecResponse(JSONResponse):
+    """JSON response encoded by msgspec, for routes returning msgspec Structs."""
+
+    def render(self, content: Any) -> bytes:
+        return _encoder.encode(content)
+
+
+def msgspec_responses(struct_type: Type[msgspec.Struct]) -> Dict[int, dict]:
+    """
+    OpenAPI `responses` entry documenting a msgspec Struct as the 200 body.
+
+    FastAPI can't build a response_model from a Struct, so the schema itself
+    is added to components.schemas by custom_openapi in app/main.py.
+    """
+    return {
+        200: {
+            "description": "Successful Response",
+            "content": {
+                "application/json": {
+                    "schema": {"$ref": f"#/components/schemas/{struct_type.__name__}"}
+                }
+            },
+        }
+    }
@@ -1,20 +1,64 @@
 import jwt
 import bcrypt
+import hashlib
+import hmac
+import re
 import secrets
-from datetime import datetime, timedelta
+import time
+from cachetools import LRUCache
+from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any
 from app.config.settings import settings
 from app.utils.exceptions import InvalidJWTException
 
 
+# Verified JWT claims keyed by blake2b digest of the token
+_jwt_claims_cache: LRUCache = LRUCache(maxsize=10_000)
+
+# API key expiry strings: a count and a unit, e.g. "1H", "30D"
+_EXPIRY_RE = re.compile(r"(\d+)([HDMY])", re.IGNORECASE)
+_EXPIRY_UNITS = {
+    "H": timedelta(hours=1),
+    "D": timedelta(days=1),
+    "M": timedelta(days=30),
+    "Y": timedelta(days=365),
+}
+
+
 def hash_api_key(key: str) -> str:
-    """Hash an API key using bcrypt."""
-    return bcrypt.hashpw(key.encode(), bcrypt.gensalt()).decode()
+    """
+    Hash an API key with HMAC-SHA256 keyed by API_KEY_PEPPER.
+    
+    Keys carry 256 bits of randomness, so a slow password hash adds nothing
+    but CPU time on every verify.
+    """
+    return hmac.new(
+        settings.API_KEY_PEPPER.encode(), key.encode(), hashlib.sha256
+    ).hexdigest()
+
+
+def is_legacy_api_key_hash(key_hash: str) -> bool:
+    """Whether a stored hash predates HMAC hashing (bcrypt)."""
+    return key_hash.startswith("$2")
 
 
 def verify_api_key(key: str, key_hash: str) -> bool:
-    """Verify an API key against its hash."""
-    return bcrypt.checkpw(key.encode(), key_hash.encode())
+    """Verify an API key against its hash (HMAC, or bcrypt for older keys)."""
+    if is_legacy_api_key_hash(key_hash):
+        return bcrypt.checkpw(key.encode(), key_hash.encode())
+    return hmac.compare_digest(hash_api_key(key), key_hash)
+
+
+def api_key_lookup(key: str) -> str:
+    """
+    Deterministic, indexable lookup value for an API key.
+    
+    This HMAC-SHA256 of the whole key, under its own secret, finds the
+    single matching row before the key_hash check.
+    """
+    return hmac.new(
+        settings.API_KEY_LOOKUP_SECRET.encode(), key.encode(), hashlib.sha256
+    ).hexdigest()
 
 
 def generate_api_key() -> str:
@@ -41,14 +85,31 @@ def create_jwt(user_id: str, email: str, expires_in_hours: int = None) -> str:
 
 
 def verify_jwt(token: str) -> Dict[str, Any]:
-    """Verify and decode a JWT token."""
+    """
+    Verify and decode a JWT token.
+    
+    Tokens that verified once are served from a cache until they expire,
+    so repeat requests skip the signature check.
+    """
+    cache_key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    payload = _jwt_claims_cache.get(cache_key)
+    if payload is not None:
+        if payload["exp"] > time.time():
+            return payload
+        _jwt_claims_cache.pop(cache_key, None)
+        raise InvalidJWTException("JWT token has expired")
+    
     try:
         payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
-        return payload
     except jwt.ExpiredSignatureError:
         raise InvalidJWTException("JWT token has expired")
     except jwt.InvalidTokenError:
         raise InvalidJWTException("Invalid JWT token")
+    
+    # Only tokens carrying an expiry can be cached safely
+    if "exp" in payload:
+        _jwt_claims_cache[cache_key] = payload
+    return payload
 
 
 def parse_expiry(expiry_str: str) -> datetime:
@@ -66,26 +127,12 @@ def parse_expiry(expiry_str: str) -> datetime:
     """
     from app.utils.exceptions import InvalidExpiryFormatException
     
-    if not expiry_str or len(expiry_str) < 2:
+    match = _EXPIRY_RE.fullmatch(expiry_str or "")
+    if not match:
         raise InvalidExpiryFormatException()
     
-    number_str = expiry_str[:-1]
-    unit = expiry_str[-1].upper()
-    
+    number, unit = match.groups()
     try:
-        number = int(number_str)
-    except ValueError:
-        raise InvalidExpiryFormatException()
-    
-    now = datetime.utcnow()
-    
-    if unit == 'H':
-        return now + timedelta(hours=number)
-    elif unit == 'D':
-        return now + timedelta(days=number)
-    elif unit == 'M':
-        return now + timedelta(days=number * 30)
-    elif unit == 'Y':
-        return now + timedelta(days=number * 365)
-    else:
+        return datetime.now(timezone.utc) + int(number) * _EXPIRY_UNITS[unit.upper()]
+    except OverflowError:
         raise InvalidExpiryFormatException()
@@ -0,0 +1,125 @@
+"""Initial schema, as created by create_all before migrations existed
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-15 00:00:00
+"""
+from typing import Sequence, Union
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Deployments that predate migrations already have these tables (made by
+    # create_all on startup); adopt them as-is so 0002 can convert them
+    if not context.is_offline_mode() and sa.inspect(op.get_bind()).has_table("users"):
+        return
+
+    op.create_table(
+        "users",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("google_id", sa.String(255), nullable=True),
+        sa.Column("email", sa.String(255), nullable=False),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_index("ix_users_google_id", "users", ["google_id"], unique=True)
+
+    op.create_table(
+        "api_keys",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("key_hash", sa.String(255), nullable=False),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("permissions", sa.JSON(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("is_revoked", sa.Boolean(), nullable=True),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_api_key_user_active", "api_keys", ["user_id", "is_active"])
+    op.create_index("ix_api_keys_expires_at", "api_keys", ["expires_at"])
+    op.create_index("ix_api_keys_is_active", "api_keys", ["is_active"])
+    op.create_index("ix_api_keys_is_revoked", "api_keys", ["is_revoked"])
+    op.create_index("ix_api_keys_key_hash", "api_keys", ["key_hash"], unique=True)
+    op.create_index("ix_api_keys_user_id", "api_keys", ["user_id"])
+
+    op.create_table(
+        "wallets",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("wallet_number", sa.String(20), nullable=False),
+        sa.Column("balance", sa.Float(), nullable=True),
+        sa.Column("currency", sa.String(3), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_wallets_user_id", "wallets", ["user_id"], unique=True)
+    op.create_index("ix_wallets_wallet_number", "wallets", ["wallet_number"], unique=True)
+
+    op.create_table(
+        "transactions",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("wallet_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("wallets.id"), nullable=False),
+        sa.Column(
+            "type",
+            sa.Enum("DEPOSIT", "TRANSFER", "WITHDRAWAL", name="transactiontype"),
+            nullable=False,
+        ),
+        sa.Column("amount", sa.Float(), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum("PENDING", "SUCCESS", "FAILED", name="transactionstatus"),
+            nullable=True,
+        ),
+        sa.Column("reference", sa.String(255), nullable=True),
+        sa.Column("recipient_wallet_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("wallets.id"), nullable=True),
+        sa.Column("description", sa.String(500), nullable=True),
+        sa.Column("meta", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_transaction_status_created", "transactions", ["status", "created_at"])
+    op.create_index("ix_transactions_created_at", "transactions", ["created_at"])
+    op.create_index("ix_transactions_reference", "transactions", ["reference"], unique=True)
+    op.create_index("ix_transactions_status", "transactions", ["status"])
+    op.create_index("ix_transactions_type", "transactions", ["type"])
+    op.create_index("ix_transactions_user_id", "transactions", ["user_id"])
+    op.create_index("ix_transactions_wallet_id", "transactions", ["wallet_id"])
+
+    op.create_table(
+        "paystack_webhook_logs",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("event", sa.String(50), nullable=False),
+        sa.Column("reference", sa.String(255), nullable=True),
+        sa.Column("transaction_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("transactions.id"), nullable=True),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("processed", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_paystack_webhook_logs_created_at", "paystack_webhook_logs", ["created_at"])
+    op.create_index("ix_paystack_webhook_logs_event", "paystack_webhook_logs", ["event"])
+    op.create_index("ix_paystack_webhook_logs_processed", "paystack_webhook_logs", ["processed"])
+    op.create_index("ix_paystack_webhook_logs_reference", "paystack_webhook_logs", ["reference"])
+    op.create_index("ix_paystack_webhook_logs_transaction_id", "paystack_webhook_logs", ["transaction_id"])
+    op.create_index("ix_webhook_reference_processed", "paystack_webhook_logs", ["reference", "processed"])
+
+
+def downgrade() -> None:
+    op.drop_table("paystack_webhook_logs")
+    op.drop_table("transactions")
+    op.drop_table("wallets")
+    op.drop_table("api_keys")
+    op.drop_table("users")
+    op.execute("DROP TYPE transactionstatus")
+    op.execute("DROP TYPE transactiontype")
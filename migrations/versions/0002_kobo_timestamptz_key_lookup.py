@@ -0,0 +1,148 @@
+"""Move the schema to the current models
+
+- transactions.type/status: native enums -> VARCHAR(16) with CHECK constraints
+- wallets.balance, transactions.amount: float naira -> bigint kobo
+- every timestamp (including api_keys.expires_at): naive UTC -> timestamptz,
+  with created_at/updated_at defaulting to now() in the database
+- paystack_webhook_logs.payload: json -> jsonb
+- api_keys.key_lookup (NULL for existing keys until their next use)
+- users.active_api_key_count (NULL until first counted)
+- ix_transaction_user_created replaces ix_transactions_user_id
+- ix_webhook_reference_event (unique) replaces ix_webhook_reference_processed
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-15 00:00:00
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (table, column, has a now() default)
+TIMESTAMP_COLUMNS = [
+    ("users", "created_at", True),
+    ("users", "updated_at", True),
+    ("wallets", "created_at", True),
+    ("wallets", "updated_at", True),
+    ("transactions", "created_at", True),
+    ("transactions", "updated_at", True),
+    ("api_keys", "created_at", True),
+    ("api_keys", "updated_at", True),
+    ("api_keys", "expires_at", False),
+    ("paystack_webhook_logs", "created_at", True),
+]
+
+
+def upgrade() -> None:
+    # Enum labels are stored as their names (DEPOSIT, SUCCESS, ...) either way
+    op.alter_column("transactions", "type", type_=sa.String(16), postgresql_using="type::text")
+    op.alter_column("transactions", "status", type_=sa.String(16), postgresql_using="status::text")
+    op.create_check_constraint("transaction_type", "transactions", "type IN ('DEPOSIT', 'TRANSFER', 'WITHDRAWAL')")
+    op.create_check_constraint("transaction_status", "transactions", "status IN ('PENDING', 'SUCCESS', 'FAILED')")
+    op.execute("DROP TYPE transactiontype")
+    op.execute("DROP TYPE transactionstatus")
+
+    op.alter_column("wallets", "balance", type_=sa.BigInteger(), postgresql_using="round(balance * 100)::bigint")
+    op.alter_column("transactions", "amount", type_=sa.BigInteger(), postgresql_using="round(amount * 100)::bigint")
+
+    # Naive values were written with datetime.utcnow()
+    for table, column, server_now in TIMESTAMP_COLUMNS:
+        op.alter_column(
+            table,
+            column,
+            type_=sa.DateTime(timezone=True),
+            postgresql_using=f"{column} AT TIME ZONE 'UTC'",
+        )
+        if server_now:
+            op.alter_column(table, column, server_default=sa.func.now())
+
+    op.alter_column(
+        "paystack_webhook_logs",
+        "payload",
+        type_=postgresql.JSONB(),
+        postgresql_using="payload::jsonb",
+    )
+
+    op.add_column("api_keys", sa.Column("key_lookup", sa.CHAR(64), nullable=True))
+    op.create_index("ix_api_keys_key_lookup", "api_keys", ["key_lookup"], unique=True)
+
+    op.add_column("users", sa.Column("active_api_key_count", sa.Integer(), nullable=True))
+
+    op.create_index(
+        "ix_transaction_user_created",
+        "transactions",
+        ["user_id", sa.text("created_at DESC")],
+    )
+    op.drop_index("ix_transactions_user_id", table_name="transactions")
+
+    # Redeliveries used to get a log row each; keep one per (reference, event),
+    # preferring a processed one, before the unique index goes on
+    op.execute(
+        """
+        DELETE FROM paystack_webhook_logs a
+        USING paystack_webhook_logs b
+        WHERE a.reference = b.reference
+          AND a.event = b.event
+          AND (coalesce(a.processed, false), a.id) < (coalesce(b.processed, false), b.id)
+        """
+    )
+    op.create_index(
+        "ix_webhook_reference_event",
+        "paystack_webhook_logs",
+        ["reference", "event"],
+        unique=True,
+        postgresql_include=["id", "processed"],
+    )
+    op.drop_index("ix_webhook_reference_processed", table_name="paystack_webhook_logs")
+
+
+def downgrade() -> None:
+    op.create_index("ix_webhook_reference_processed", "paystack_webhook_logs", ["reference", "processed"])
+    op.drop_index("ix_webhook_reference_event", table_name="paystack_webhook_logs")
+
+    op.create_index("ix_transactions_user_id", "transactions", ["user_id"])
+    op.drop_index("ix_transaction_user_created", table_name="transactions")
+
+    op.drop_column("users", "active_api_key_count")
+
+    op.drop_index("ix_api_keys_key_lookup", table_name="api_keys")
+    op.drop_column("api_keys", "key_lookup")
+
+    op.alter_column("paystack_webhook_logs", "payload", type_=sa.JSON(), postgresql_using="payload::json")
+
+    for table, column, server_now in TIMESTAMP_COLUMNS:
+        if server_now:
+            op.alter_column(table, column, server_default=None)
+        op.alter_column(
+            table,
+            column,
+            type_=sa.DateTime(),
+            postgresql_using=f"{column} AT TIME ZONE 'UTC'",
+        )
+
+    op.alter_column("transactions", "amount", type_=sa.Float(), postgresql_using="amount / 100.0")
+    op.alter_column("wallets", "balance", type_=sa.Float(), postgresql_using="balance / 100.0")
+
+    op.drop_constraint("transaction_status", "transactions", type_="check")
+    op.drop_constraint("transaction_type", "transactions", type_="check")
+    op.execute("CREATE TYPE transactiontype AS ENUM ('DEPOSIT', 'TRANSFER', 'WITHDRAWAL')")
+    op.execute("CREATE TYPE transactionstatus AS ENUM ('PENDING', 'SUCCESS', 'FAILED')")
+    op.alter_column(
+        "transactions",
+        "type",
+        type_=postgresql.ENUM(name="transactiontype", create_type=False),
+        postgresql_using="type::transactiontype",
+    )
+    op.alter_column(
+        "transactions",
+        "status",
+        type_=postgresql.ENUM(name="transactionstatus", create_type=False),
+        postgresql_using="status::transactionstatus",
+    )